@@ -1,8 +1,21 @@
+import io
+import re
+from dataclasses import dataclass
+
 import streamlit as st
 import pandas as pd
+import numpy as np
 import matplotlib.pyplot as plt
+import altair as alt
 from sqlalchemy import create_engine, text
 
+try:
+    # Optional: reads result sets straight into columnar buffers, skipping
+    # Python-level row construction entirely.
+    import connectorx as cx
+except ImportError:
+    cx = None
+
 # ---------- PAGE CONFIG ----------
 st.set_page_config(page_title="IMDb 2024 SQL-Based Visualization", layout="wide")
 
@@ -10,74 +23,284 @@ st.title("🎬 IMDb 2024 Interactive Data Analysis & SQL Visualization")
 st.caption("Dynamically explore IMDb 2024 movies using SQL queries and live charts.")
 
 # ---------- DATABASE CONNECTION ----------
-DB_HOST = st.secrets["DB_HOST"]
-DB_USER = st.secrets["DB_USER"]
-DB_PASSWORD = st.secrets["DB_PASSWORD"]
-DB_NAME = st.secrets["DB_NAME"]
+@dataclass(frozen=True)
+class DBConfig:
+    host: str
+    user: str
+    password: str
+    name: str
+
+# Read the secrets once at import instead of doing a TOML lookup per rerun,
+# and build the connection strings as module constants.
+CFG = DBConfig(
+    host=st.secrets["DB_HOST"],
+    user=st.secrets["DB_USER"],
+    password=st.secrets["DB_PASSWORD"],
+    name=st.secrets["DB_NAME"],
+)
+# Prefer mysqlclient (C extension, ~3x faster row fetch on big result sets)
+# and fall back to pure-Python PyMySQL where it is not installed.
+try:
+    import MySQLdb  # noqa: F401
+    _DRIVER = "mysql+mysqldb"
+except ImportError:
+    _DRIVER = "mysql+pymysql"
+
+CONN_STR = f"{_DRIVER}://{CFG.user}:{CFG.password}@{CFG.host}/{CFG.name}"
+CX_CONN_STR = f"mysql://{CFG.user}:{CFG.password}@{CFG.host}/{CFG.name}"
+
+@st.cache_resource
+def get_engine():
+    # Build the engine (and its connection pool) once per process instead of
+    # on every rerun — reconnecting to RDS per click is the slow part.
+    return create_engine(
+        CONN_STR,
+        pool_size=5,
+        max_overflow=5,
+        pool_pre_ping=True,
+        pool_recycle=1800,
+        future=True,
+    )
+
+# Only these columns are used by the filters and charts — projecting them in
+# SQL keeps bytes-over-wire and pandas allocation down. votes_clean and
+# duration_mins are derived inside MySQL so they land already typed and the
+# pandas cleaning only runs on the local-file fallback.
+CSV_PATH = "data/movies_2024_detailed.csv"
+PARQUET_PATH = "data/movies_2024_detailed.parquet"
 
-@st.cache_data
+LOAD_SQL = """
+SELECT title, genre, rating, votes, duration,
+       CAST(REPLACE(REPLACE(votes, 'K', ''), 'M', '') AS DECIMAL(10, 2))
+           * CASE WHEN votes LIKE '%K' THEN 1000
+                  WHEN votes LIKE '%M' THEN 1000000
+                  ELSE 1 END AS votes_clean,
+       COALESCE(CAST(REGEXP_SUBSTR(duration, '[0-9]+(?=h)') AS UNSIGNED), 0) * 60
+           + COALESCE(CAST(REGEXP_SUBSTR(duration, '[0-9]+(?=m)') AS UNSIGNED), 0) AS duration_mins
+FROM movies_2024
+"""
+
+# persist="disk" keeps the snapshot across container restarts, so a restart
+# (or an RDS outage) does not force a full re-read. The user-parameterized
+# explorer cache below deliberately stays memory-only.
+@st.cache_data(ttl="1h", max_entries=2, persist="disk")
 def load_data():
     try:
-        engine = create_engine(f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}")
-        df = pd.read_sql(text("SELECT * FROM movies_2024"), con=engine)
+        if cx is not None:
+            df = cx.read_sql(CX_CONN_STR, LOAD_SQL, return_type="pandas", protocol="binary")
+        else:
+            # Stream in chunks so peak memory stays bounded on large tables.
+            chunks = pd.read_sql(text(LOAD_SQL), con=get_engine(), chunksize=50_000)
+            df = pd.concat(chunks, ignore_index=True)
         st.sidebar.success("Connected to AWS RDS ")
     except Exception as e:
-        st.sidebar.warning(f"Database connection failed ({e}). Loading CSV backup...")
+        st.sidebar.warning(f"Database connection failed ({e}). Loading local backup...")
         try:
-            df = pd.read_csv("data/movies_2024_detailed.csv")
-            st.sidebar.info("Loaded from local CSV.")
-        except:
-            st.error("CSV file not found. Please upload 'movies_2024_detailed.csv'.")
-            df = pd.DataFrame()
+            # Parquet is columnar and pre-typed, so the cold load skips CSV
+            # parsing entirely and reads only the columns the UI uses.
+            df = pd.read_parquet(
+                PARQUET_PATH,
+                engine="pyarrow",
+                columns=["title", "genre", "rating", "votes", "duration"],
+                memory_map=True,
+            )
+            st.sidebar.info("Loaded from local Parquet.")
+        except Exception:
+            try:
+                # The detailed CSV also carries storyline/director/actors,
+                # which nothing downstream uses — don't parse or cache them.
+                df = pd.read_csv(CSV_PATH, usecols=["title", "genre", "rating", "votes", "duration"])
+                st.sidebar.info("Loaded from local CSV.")
+                try:
+                    # Rebuild the snapshot so the next cold start skips CSV
+                    # tokenization and dtype inference.
+                    df.to_parquet(PARQUET_PATH, engine="pyarrow", compression="snappy")
+                except Exception:
+                    pass
+            except:
+                st.error("CSV file not found. Please upload 'movies_2024_detailed.csv'.")
+                df = pd.DataFrame()
+    return df
+
+# Ad-hoc SELECTs get a row cap and an execution-time ceiling so a runaway
+# query can neither flood pandas nor hang the app.
+QUERY_ROW_CAP = 5000
+
+def cap_query(sql):
+    sql = sql.strip().rstrip(';')
+    # Leading comments would hide the first keyword from the classification
+    # below, letting the query through with no cap at all.
+    prev = None
+    while prev != sql:
+        prev = sql
+        sql = re.sub(r'(?s)^(?:--[^\n]*\n|#[^\n]*\n|/\*.*?\*/)\s*', '', sql).lstrip()
+    # A trailing line comment would both hide an existing LIMIT from the
+    # clamp and swallow an appended one, so strip it before looking at the
+    # tail.
+    prev = None
+    while prev != sql:
+        prev = sql
+        sql = re.sub(r'(?:--|#)[^\n]*\s*$', '', sql).rstrip().rstrip(';')
+    if re.match(r'(?is)^\s*(?:with\b|\()', sql):
+        # CTE or parenthesized query expression: MySQL 8 allows either inside
+        # a derived table, so wrap the whole thing — the outer query carries
+        # both the hint and the cap without having to locate the inner
+        # SELECT.
+        return (f"SELECT /*+ MAX_EXECUTION_TIME(10000) */ * "
+                f"FROM ({sql}) AS capped_query LIMIT {QUERY_ROW_CAP}")
+    if re.match(r'(?is)^\s*select\b', sql):
+        sql = re.sub(r'(?is)^\s*select\b', 'SELECT /*+ MAX_EXECUTION_TIME(10000) */', sql, count=1)
+        # Only a LIMIT at the tail of the statement bounds the outer query —
+        # one buried in a subquery does not count. Clamp an over-cap LIMIT
+        # instead of trusting it.
+        tail = re.search(r'(?is)\blimit\s+(\d+)(?:\s*,\s*(\d+)|\s+offset\s+\d+)?\s*$', sql)
+        if tail is None:
+            sql += f' LIMIT {QUERY_ROW_CAP}'
+        else:
+            count_group = 2 if tail.group(2) else 1
+            if int(tail.group(count_group)) > QUERY_ROW_CAP:
+                start, end = tail.span(count_group)
+                sql = sql[:start] + str(QUERY_ROW_CAP) + sql[end:]
+    return sql
+
+# Bounded cache for ad-hoc explorer queries: keyed on arbitrary user SQL, so
+# without ttl/max_entries it would grow forever in a long-running container.
+@st.cache_data(ttl="15m", max_entries=32, show_spinner=True)
+def run_query(sql):
+    return pd.read_sql(text(sql), con=get_engine())
+
+@st.cache_data(ttl="1h", max_entries=2)
+def clean_data(df_raw):
+    # Deterministic transform of the loaded frame — cached so the cleaning
+    # and dtype work run once per process instead of on every widget change.
+    df = df_raw.copy()
+    df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
+
+    if 'votes_clean' in df.columns:
+        # SQL path: already derived server-side, just normalize the DECIMAL.
+        df['votes_clean'] = pd.to_numeric(df['votes_clean'], errors='coerce').fillna(0).astype('int64')
+    else:
+        # Parse votes in one vectorized pass: numeric body times K/M
+        # multiplier, instead of per-row string replacement (also keeps
+        # 1.5K = 1500, not 1.5).
+        votes_str = df['votes'].astype('string').str.replace(',', '', regex=False)
+        votes_body = pd.to_numeric(votes_str.str.extract(r'([\d.]+)', expand=False), errors='coerce').fillna(0)
+        votes_mult = votes_str.str.extract(r'([KkMm]?)$', expand=False).map(
+            {'K': 1e3, 'k': 1e3, 'M': 1e6, 'm': 1e6}).fillna(1.0)
+        df['votes_clean'] = (votes_body.to_numpy() * votes_mult.to_numpy()).astype('int64')
+
+    if 'duration_mins' in df.columns:
+        df['duration_mins'] = pd.to_numeric(df['duration_mins'], errors='coerce').fillna(0).astype(np.int32)
+    else:
+        # Parse durations like "2h 21m" with one vectorized regex extract
+        # instead of a per-row Python function: grab hours and minutes
+        # together, then do the arithmetic on int arrays.
+        dur_parts = df['duration'].astype('string').str.extract(r'(?:(\d+)\s*h)?\s*(?:(\d+)\s*m)?', expand=True)
+        dur_h = pd.to_numeric(dur_parts[0], errors='coerce').fillna(0).to_numpy(np.int32)
+        dur_m = pd.to_numeric(dur_parts[1], errors='coerce').fillna(0).to_numpy(np.int32)
+        df['duration_mins'] = (dur_h * 60 + dur_m).astype(np.int32)
+
+    # Narrow dtypes: roughly halves the frame in memory, and category/arrow
+    # columns make genre counting and substring filters run as C kernels.
+    df['rating'] = df['rating'].astype('float32')
+    df['votes_clean'] = df['votes_clean'].astype('int32')
+    df['duration_mins'] = df['duration_mins'].astype('int16')
+    df['genre'] = df['genre'].astype('category')
+    df['title'] = df['title'].astype('string[pyarrow]')
     return df
 
+@st.cache_data(ttl="1h")
+def genre_mask_table(_df, data_rev):
+    # One boolean column per individual genre label (a row can list several,
+    # e.g. "Drama, Fantasy, Sci-Fi"). Built once per dataset; filtering then
+    # reduces to an OR over a few bool columns instead of a regex scan on
+    # every rerun. The frame is passed underscore-prefixed to skip hashing
+    # it; data_rev is the cheap fingerprint that keys the memo so a reload
+    # that changes the table rolls this cache over too.
+    #
+    # genre is categorical, so the string splitting only has to touch the
+    # unique combos; rows are then filled in by category code.
+    genre = _df['genre'].astype('category')
+    combos = pd.Series(genre.cat.categories, dtype='string')
+    exploded = combos.str.split(r',\s*', regex=True).explode()
+    combo_table = pd.get_dummies(exploded).groupby(level=0).max().astype(bool)
+    combo_arr = combo_table.reindex(range(len(combos)), fill_value=False).to_numpy()
+
+    codes = genre.cat.codes.to_numpy()
+    out = np.zeros((len(_df), combo_arr.shape[1]), dtype=bool)
+    valid = codes >= 0  # -1 means missing genre
+    out[valid] = combo_arr[codes[valid]]
+    # Plain ndarray + column index: filtering is then a single any() over
+    # contiguous bool memory, with no pandas alignment in the hot path.
+    return out, {g: i for i, g in enumerate(combo_table.columns)}
+
+@st.cache_data(ttl="1h")
+def genre_options(_df, data_rev):
+    # Dataset-level aggregate: computed once per dataset, not on every rerun.
+    return [g for g in genre_mask_table(_df, data_rev)[1] if g]
+
+@st.cache_data(ttl="15m", max_entries=64)
+def bar_chart_png(items, x_label, y_label, color=None):
+    # Rasterize keyed on the plotted values: a rerun with the same data
+    # reuses the PNG bytes instead of allocating a fresh Figure/Axes/Canvas
+    # and re-rendering.
+    fig, ax = plt.subplots(figsize=(5, 3))
+    ax.bar([str(k) for k, _ in items], [v for _, v in items], color=color or 'C0')
+    ax.set_xlabel(x_label)
+    ax.set_ylabel(y_label)
+    ax.tick_params(axis='x', rotation=90)
+    fig.tight_layout()
+    buf = io.BytesIO()
+    fig.savefig(buf, format='png', dpi=90)
+    plt.close(fig)
+    return buf.getvalue()
+
 df = load_data()
 if df.empty:
     st.stop()
+df = clean_data(df)
+
+# Cheap fingerprint of the cleaned frame. The derived caches below skip
+# hashing the frame itself, so this keys them instead: when the hourly
+# reload changes the table, they roll over with it rather than serving a
+# stale (or wrongly sized) result.
+data_rev = (len(df), int(df['votes_clean'].to_numpy().sum()))
 
 # ---------- SIDEBAR FILTERS ----------
 st.sidebar.header(" Filters")
 
-genres = sorted(df['genre'].dropna().unique().tolist())
+genres = genre_options(df, data_rev)
 selected_genres = st.sidebar.multiselect("Select Genre(s):", genres)
 min_rating = st.sidebar.slider("Minimum Rating", 0.0, 10.0, 0.0, 0.1)
 min_votes = st.sidebar.number_input("Minimum Votes", min_value=0, value=0)
 duration_filter = st.sidebar.radio("Filter by Duration", ["All", "< 2 hrs", "2–3 hrs", "> 3 hrs"], index=0)
 
 # ---------- FILTER DATA ----------
-df['rating'] = pd.to_numeric(df['rating'], errors='coerce')
-df['votes_clean'] = df['votes'].replace('N/A', '0').replace(r'[KM]', '', regex=True)
-df['votes_clean'] = pd.to_numeric(df['votes_clean'], errors='coerce')
+@st.cache_data(ttl="1h", max_entries=64)
+def apply_filters(_df, data_rev, genres_tuple, min_rating, min_votes, duration_filter):
+    # Accumulate one boolean mask and slice once at the end — chained
+    # filtered_df = filtered_df[...] steps would copy the frame per filter.
+    # Memoized on the widget state plus the data fingerprint (_df is skipped
+    # by the hasher), so flipping back to a previous filter combination is
+    # free and a reload invalidates the memo.
+    mask = np.ones(len(_df), dtype=bool)
+    if genres_tuple:
+        genre_oh, genre_col = genre_mask_table(_df, data_rev)
+        mask &= genre_oh[:, [genre_col[g] for g in genres_tuple]].any(axis=1)
+    if min_rating > 0:
+        mask &= _df['rating'].fillna(0).to_numpy() >= min_rating
+    if min_votes > 0:
+        mask &= _df['votes_clean'].to_numpy() >= min_votes
+    duration_mins = _df['duration_mins'].to_numpy()
+    if duration_filter == "< 2 hrs":
+        mask &= duration_mins < 120
+    elif duration_filter == "2–3 hrs":
+        mask &= (duration_mins >= 120) & (duration_mins <= 180)
+    elif duration_filter == "> 3 hrs":
+        mask &= duration_mins > 180
+    return _df.loc[mask]
 
-def convert_duration(d):
-    try:
-        if 'h' in d and 'm' in d:
-            h, m = d.replace('h', '').replace('m', '').split()
-            return int(h) * 60 + int(m)
-        elif 'h' in d:
-            return int(d.replace('h', '').strip()) * 60
-        elif 'm' in d:
-            return int(d.replace('m', '').strip())
-        else:
-            return 0
-    except:
-        return 0
-
-df['duration_mins'] = df['duration'].fillna("0").apply(convert_duration)
-filtered_df = df.copy()
-
-if selected_genres:
-    filtered_df = filtered_df[filtered_df['genre'].str.contains('|'.join(selected_genres), case=False, na=False)]
-if min_rating > 0:
-    filtered_df = filtered_df[filtered_df['rating'] >= min_rating]
-if min_votes > 0:
-    filtered_df = filtered_df[filtered_df['votes_clean'] >= min_votes]
-if duration_filter == "< 2 hrs":
-    filtered_df = filtered_df[filtered_df['duration_mins'] < 120]
-elif duration_filter == "2–3 hrs":
-    filtered_df = filtered_df[(filtered_df['duration_mins'] >= 120) & (filtered_df['duration_mins'] <= 180)]
-elif duration_filter == "> 3 hrs":
-    filtered_df = filtered_df[filtered_df['duration_mins'] > 180]
+filtered_df = apply_filters(df, data_rev, tuple(sorted(selected_genres)), min_rating, min_votes, duration_filter)
 
 # ---------- SQL QUERY EXPLORER ----------
 st.subheader(" SQL Query Explorer (Dynamic Visualization)")
@@ -94,12 +317,15 @@ query_input = st.text_area("Enter your SQL query:", "SELECT * FROM movies_2024 L
 
 if st.button("Run Query"):
     try:
-        engine = create_engine(f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}/{DB_NAME}")
-        result_df = pd.read_sql(text(query_input), con=engine)
+        result_df = run_query(cap_query(query_input))
 
         if not result_df.empty:
-            st.success(f"Query executed successfully. Showing {len(result_df)} records.")
-            st.dataframe(result_df, use_container_width=True)
+            st.success(f"Query executed successfully. Returned {len(result_df)} records.")
+            if len(result_df) > 500:
+                st.caption(f"Showing the first 500 of {len(result_df)} rows.")
+            # Table rendering is the other bottleneck for big results — only
+            # ship a bounded slice to the browser.
+            st.dataframe(result_df.head(500), use_container_width=True)
 
             # ---------- DYNAMIC VISUALIZATION ----------
             st.subheader(" Visualization for Query Results")
@@ -109,28 +335,51 @@ if st.button("Run Query"):
             cat_cols = result_df.select_dtypes(exclude=['float64', 'int64']).columns.tolist()
 
             if len(numeric_cols) >= 2:
-                st.markdown("**Scatter Plot (First 2 Numeric Columns)**")
-                fig, ax = plt.subplots(figsize=(5, 3))
-                ax.scatter(result_df[numeric_cols[0]], result_df[numeric_cols[1]], color='teal', alpha=0.6)
-                ax.set_xlabel(numeric_cols[0])
-                ax.set_ylabel(numeric_cols[1])
-                st.pyplot(fig)
+                x_col, y_col = numeric_cols[0], numeric_cols[1]
+                if len(result_df) > 5000:
+                    # Binned 2D histogram, aggregated server-side: only the
+                    # non-empty cells (at most 60x40) are embedded in the
+                    # chart spec, never the rows themselves — embedding the
+                    # raw frame would both ship every point and trip
+                    # Altair's 5000-row MaxRowsError.
+                    st.markdown("**Binned Density (First 2 Numeric Columns)**")
+                    x = pd.to_numeric(result_df[x_col], errors='coerce').to_numpy(dtype='float64')
+                    y = pd.to_numeric(result_df[y_col], errors='coerce').to_numpy(dtype='float64')
+                    ok = ~(np.isnan(x) | np.isnan(y))
+                    counts, x_edges, y_edges = np.histogram2d(x[ok], y[ok], bins=(60, 40))
+                    xi, yi = np.nonzero(counts)
+                    cells = pd.DataFrame({
+                        'x0': x_edges[xi], 'x1': x_edges[xi + 1],
+                        'y0': y_edges[yi], 'y1': y_edges[yi + 1],
+                        'count': counts[xi, yi].astype(int),
+                    })
+                    heat = alt.Chart(cells).mark_rect().encode(
+                        x=alt.X('x0:Q', title=x_col),
+                        x2=alt.X2('x1'),
+                        y=alt.Y('y0:Q', title=y_col),
+                        y2=alt.Y2('y1'),
+                        color=alt.Color('count:Q', title='count'),
+                    )
+                    st.altair_chart(heat, use_container_width=True)
+                else:
+                    st.markdown("**Scatter Plot (First 2 Numeric Columns)**")
+                    # Vega-Lite renders in the browser, so no server-side
+                    # rasterization and pan/zoom come for free.
+                    scatter = alt.Chart(result_df[[x_col, y_col]]).mark_circle(opacity=0.4, color='teal').encode(
+                        x=f"{x_col}:Q",
+                        y=f"{y_col}:Q",
+                    )
+                    st.altair_chart(scatter, use_container_width=True)
 
             elif len(numeric_cols) == 1 and len(cat_cols) >= 1:
                 st.markdown("**Bar Chart (Category vs Numeric)**")
-                fig, ax = plt.subplots(figsize=(5, 3))
-                result_df.groupby(cat_cols[0])[numeric_cols[0]].mean().sort_values(ascending=False).head(10).plot(kind='bar', ax=ax)
-                ax.set_xlabel(cat_cols[0])
-                ax.set_ylabel(numeric_cols[0])
-                st.pyplot(fig)
+                means = result_df.groupby(cat_cols[0])[numeric_cols[0]].mean().nlargest(10)
+                st.image(bar_chart_png(tuple(means.items()), cat_cols[0], numeric_cols[0]))
 
             elif len(cat_cols) >= 1:
                 st.markdown("**Category Frequency Chart**")
-                fig, ax = plt.subplots(figsize=(5, 3))
-                result_df[cat_cols[0]].value_counts().head(10).plot(kind='bar', color='skyblue', ax=ax)
-                ax.set_xlabel(cat_cols[0])
-                ax.set_ylabel("Count")
-                st.pyplot(fig)
+                counts = result_df[cat_cols[0]].value_counts().head(10)
+                st.image(bar_chart_png(tuple(counts.items()), cat_cols[0], "Count", color='skyblue'))
 
             else:
                 st.info("No suitable numeric or categorical columns for visualization.")
@@ -145,4 +394,8 @@ st.divider()
 # ---------- FILTERED DATA SECTION ----------
 st.subheader(" Filtered Movie Dataset")
 st.caption("These results dynamically update as you change filters.")
-st.dataframe(filtered_df[['title', 'genre', 'rating', 'votes', 'duration']], use_container_width=True)
+# Cap what goes to the browser — table rendering, not filtering, is the
+# slow part once thousands of rows match.
+if len(filtered_df) > 1000:
+    st.caption(f"Showing the first 1,000 of {len(filtered_df)} matching movies.")
+st.dataframe(filtered_df[['title', 'genre', 'rating', 'votes', 'duration']].head(1000), use_container_width=True)